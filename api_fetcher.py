@@ -1,9 +1,26 @@
 import requests
+import orjson
 import logging
+import math
+import threading
+from urllib.parse import quote
+from concurrent.futures import ThreadPoolExecutor
 from auth import get_ebay_access_token
+from http_client import build_session
 
 logger = logging.getLogger(__name__)
 
+# Upper bound on in-flight eBay calls per process
+MAX_CONCURRENT_REQUESTS = 20
+
+# Shared session so TCP+TLS connections to api.ebay.com are reused across
+# searches; transient network errors and 429/5xx responses are retried by urllib3
+# (honouring Retry-After), so only a 401 is handled here.
+# One keep-alive connection per allowed in-flight call, so concurrent page
+# fetches never open connections that the pool would discard afterwards.
+_SESSION = build_session(pool_connections=1, pool_maxsize=MAX_CONCURRENT_REQUESTS)
+_REQUEST_SEMAPHORE = threading.BoundedSemaphore(MAX_CONCURRENT_REQUESTS)
+
 # eBay condition filter mapping for API calls
 # Updated to include all possible eBay condition values
 EBAY_CONDITION_FILTERS = {
@@ -12,6 +29,18 @@ EBAY_CONDITION_FILTERS = {
     'all': None  # No filter applied
 }
 
+EBAY_SEARCH_URL = "https://api.ebay.com/buy/browse/v1/item_summary/search"
+
+# MATCHING_ITEMS is already the Browse search default; it is pinned explicitly so the
+# response never grows refinement data (it does not shrink the default payload)
+EBAY_SEARCH_FIELDGROUPS = "MATCHING_ITEMS"
+
+# Query-string fragments for each condition, built once so the per-call URL is a single format
+_CONDITION_QUERY = {
+    condition: f"&filter=conditions:{filter_value}" if filter_value else ""
+    for condition, filter_value in EBAY_CONDITION_FILTERS.items()
+}
+
 # Comprehensive condition mapping for reference and future use
 EBAY_ALL_CONDITIONS = {
     'new': [
@@ -42,29 +71,24 @@ EBAY_ALL_CONDITIONS = {
 def fetch_ebay_listings(product_name, entries_per_page=100, page_number=1, condition='all', max_retries=3):
     for attempt in range(max_retries):
         try:
-            access_token = get_ebay_access_token()
-            url = f"https://api.ebay.com/buy/browse/v1/item_summary/search?q={product_name}&limit={entries_per_page}&offset={(page_number - 1) * entries_per_page}"
-            
-            # Add condition filter if specified
-            if condition != 'all' and condition in EBAY_CONDITION_FILTERS:
-                filter_value = EBAY_CONDITION_FILTERS[condition]
-                if filter_value:
-                    url += f"&filter=conditions:{filter_value}"
-                    logger.info(f"Applied condition filter '{condition}' with value '{filter_value}'")
-                else:
-                    logger.info(f"No filter value for condition '{condition}'")
-            else:
-                logger.info(f"No condition filter applied (condition: '{condition}')")
+            # A retry only happens after a 401, so fetch a fresh token rather than the cached one
+            access_token = get_ebay_access_token(force_refresh=attempt > 0)
+            url = (f"{EBAY_SEARCH_URL}?q={quote(product_name, safe='')}&limit={entries_per_page}"
+                   f"&offset={(page_number - 1) * entries_per_page}&fieldgroups={EBAY_SEARCH_FIELDGROUPS}"
+                   f"{_CONDITION_QUERY.get(condition, '')}")
             
-            logger.info(f"eBay API URL: {url}")
+            if logger.isEnabledFor(logging.INFO):
+                logger.info(f"eBay API URL: {url} (condition: '{condition}')")
             
             headers = {"Authorization": f"Bearer {access_token}"}
             
-            response = requests.get(url, headers=headers, timeout=15)
+            with _REQUEST_SEMAPHORE:
+                response = _SESSION.get(url, headers=headers, timeout=15)
             response.raise_for_status()
             
-            result = response.json()
-            logger.info(f"eBay API returned {len(result.get('itemSummaries', []))} items")
+            # orjson parses the multi-KB itemSummaries payload several times faster than stdlib json
+            result = orjson.loads(response.content)
+            logger.info("eBay API returned %d items", len(result.get('itemSummaries', [])))
             
             return result
 
@@ -75,9 +99,43 @@ def fetch_ebay_listings(product_name, entries_per_page=100, page_number=1, condi
             logger.error(f"eBay API error: {err.response.text if hasattr(err, 'response') else str(err)}")
             raise
         except requests.exceptions.RequestException as ex:
+            # Transient failures and rate limits were already retried with backoff by the session
             logger.error(f"Network error: {str(ex)}")
-            if attempt < max_retries - 1:
-                logger.info(f"Retrying... ({attempt + 1}/{max_retries})")
-                continue
             raise
-    raise ConnectionError("Max retries exceeded for eBay API")
\ No newline at end of file
+    raise ConnectionError("Max retries exceeded for eBay API")
+
+def fetch_ebay_pages(product_name, page_numbers, entries_per_page=100, condition='all'):
+    """Fetch several result pages concurrently and merge their itemSummaries"""
+    page_numbers = list(page_numbers)
+    if len(page_numbers) == 1:
+        return fetch_ebay_listings(product_name, entries_per_page, page_numbers[0], condition)
+
+    with ThreadPoolExecutor(max_workers=min(len(page_numbers), MAX_CONCURRENT_REQUESTS)) as executor:
+        results = list(executor.map(
+            lambda page: fetch_ebay_listings(product_name, entries_per_page, page, condition),
+            page_numbers
+        ))
+
+    merged = _merge_pages(results)
+    logger.info(f"Fetched {len(page_numbers)} pages concurrently, {len(merged['itemSummaries'])} items total")
+    return merged
+
+def fetch_all_listings(product_name, entries_per_page=100, condition='all', max_pages=10):
+    """Fetch every result page (up to max_pages): page 1 first to learn the total, the rest concurrently"""
+    first_page = fetch_ebay_listings(product_name, entries_per_page, 1, condition)
+    
+    total = int(first_page.get('total', 0))
+    page_count = min(math.ceil(total / entries_per_page), max_pages)
+    if page_count <= 1:
+        return first_page
+    
+    remaining = fetch_ebay_pages(product_name, range(2, page_count + 1), entries_per_page, condition)
+    return _merge_pages([first_page, remaining])
+
+def _merge_pages(results):
+    """Keep the first page's metadata (total, href, ...) and append every page's items"""
+    merged = dict(results[0])
+    merged['itemSummaries'] = [
+        item for result in results for item in result.get('itemSummaries', [])
+    ]
+    return merged
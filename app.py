@@ -1,21 +1,40 @@
-from flask import Flask, request, jsonify, session, g, send_from_directory
+from flask import Flask, Response, request, jsonify, g, send_from_directory
+from flask.json.provider import DefaultJSONProvider
 from flask_caching import Cache
-from flask_limiter import Limiter
-from flask_limiter.util import get_remote_address
 from flask_cors import CORS
 import os
+import uuid
+import orjson
+import msgspec
+from itsdangerous import URLSafeTimedSerializer, BadSignature
 from dotenv import load_dotenv
 import logging
-from auth import get_ebay_access_token, EbayAuthError
-from api_fetcher import fetch_ebay_listings
+from auth import get_ebay_access_token, start_token_refresher, EbayAuthError
+from api_fetcher import fetch_ebay_pages, fetch_all_listings
 from processor import process_ebay_data, sort_dataframe, filter_data
 from exporter import export_data
-from exchange import get_exchange_rate, ExchangeRateUnavailableError
 from exceptions import ProcessingError
+from schemas import SearchRequest
+from rate_limit import TokenBucket, SlidingWindowCounter, RedisSlidingWindow
 
 load_dotenv(override=True)
 
+class OrjsonProvider(DefaultJSONProvider):
+    """JSON provider backed by orjson for faster serialization of large product lists"""
+    
+    def dumps(self, obj, **kwargs):
+        option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        if kwargs.get('sort_keys', self.sort_keys):
+            option |= orjson.OPT_SORT_KEYS
+        if kwargs.get('indent'):
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=self.default, option=option).decode()
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 app.secret_key = os.getenv('FLASK_SECRET_KEY', 'fallback_secret_key')
 
 # Enable CORS for production (configure origins properly in production)
@@ -32,6 +51,7 @@ app.config.update({
     'EBAY_CLIENT_SECRET': os.getenv('EBAY_CLIENT_SECRET'),
     'EXCHANGE_API_KEY': os.getenv('EXCHANGE_API_KEY'),
     'EBAY_SCOPE': os.getenv('EBAY_SCOPE', 'https://api.ebay.com/oauth/api_scope'),
+    'RATELIMIT_STORAGE_URI': os.getenv('RATELIMIT_STORAGE_URI'),
     'CACHE_TYPE': 'SimpleCache',
     'CACHE_DEFAULT_TIMEOUT': 86400 
 })
@@ -40,32 +60,86 @@ app.config.update({
 cache = Cache(app)
 
 # Initialize rate limiting
-limiter = Limiter(
-    get_remote_address,
-    app=app,
-    default_limits=["5 per minute"],
-    storage_uri="memory://",
-)
+# Sliding window for the other endpoints: 5 requests/minute per route and client, without fixed-window boundary bursts.
+# With RATELIMIT_STORAGE_URI (redis://...) the window is shared by all workers.
+if app.config['RATELIMIT_STORAGE_URI']:
+    default_rate_limiter = RedisSlidingWindow(limit=5, window=60, storage_uri=app.config['RATELIMIT_STORAGE_URI'])
+else:
+    default_rate_limiter = SlidingWindowCounter(limit=5, window=60)
+
+# Token bucket for the search endpoint: 5 requests/second sustained, bursts of up to 5
+search_rate_limiter = TokenBucket(rate=5, capacity=5)
+
+# Endpoints that bypass rate limiting (None is an unmatched URL)
+RATE_LIMIT_EXEMPT_ENDPOINTS = frozenset({None, 'static', 'serve_static'})
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def get_cached_exchange_rate(base_currency, target_currency):
-    """Get exchange rate with caching"""
-    cache_key = f"exchange_rate_{base_currency}_{target_currency}"
-    rate = cache.get(cache_key)
+# Fetch the eBay token at startup and renew it in the background so requests never wait on OAuth
+start_token_refresher()
+
+# Allowed search parameter values
+ALLOWED_CONDITIONS = frozenset({'all', 'new', 'used'})
+ALLOWED_CURRENCIES = frozenset({'USD', 'EUR', 'GBP', 'JPY', 'CAD', 'CNY', 'HKD', 'AUD', 'SGD', 'CHF'})
+ALLOWED_EXPORT_FORMATS = frozenset({'csv', 'excel', 'json', 'parquet'})
+
+# Maximum number of result pages a single search may fan out to
+MAX_SEARCH_PAGES = 10
+
+# eBay listings change quickly; only reuse a search payload for a few minutes
+EBAY_SEARCH_CACHE_TIMEOUT = 300
+
+# How long the processed results of a search stay available for export
+SEARCH_RESULTS_CACHE_TIMEOUT = 600
+
+# How long a search id handed to the client can still be exported
+SEARCH_ID_MAX_AGE = 86400
+
+# Search ids are signed tokens carrying the validated search parameters, so /api/export
+# works on any worker; the per-process cache only short-circuits the re-run
+search_id_serializer = URLSafeTimedSerializer(app.secret_key, salt='search-export')
+
+def get_cached_ebay_listings(product_name, page, pages, condition):
+    """Get eBay listings with short-lived caching so /api/export reuses the search payload"""
+    cache_key = f"ebay_search_{product_name}_{page}_{pages}_{condition}"
+    raw_data = cache.get(cache_key)
     
-    if rate is None:
-        try:
-            rate = get_exchange_rate(base_currency, target_currency)
-            cache.set(cache_key, rate)
-            logger.info(f"Fetched fresh exchange rate: {base_currency}->{target_currency}")
-        except ExchangeRateUnavailableError as e:
-            logger.error(f"Exchange rate error: {str(e)}")
-            raise ProcessingError("Currency conversion unavailable") from e
+    if raw_data is None:
+        if pages == 'all':
+            raw_data = fetch_all_listings(product_name, condition=condition, max_pages=MAX_SEARCH_PAGES)
+        else:
+            raw_data = fetch_ebay_pages(
+                product_name=product_name,
+                page_numbers=range(page, page + pages),
+                condition=condition
+            )
+        cache.set(cache_key, raw_data, timeout=EBAY_SEARCH_CACHE_TIMEOUT)
+        logger.info(f"Fetched fresh eBay listings for '{product_name}' (page {page}, {pages} pages)")
     
-    return rate
+    return raw_data
+
+@app.before_request
+def enforce_rate_limits():
+    """Apply the token bucket to search and the sliding window to everything else"""
+    # Static assets, unmatched URLs and CORS preflights are not limited (as with Flask-Limiter)
+    if request.endpoint in RATE_LIMIT_EXEMPT_ENDPOINTS or request.method == 'OPTIONS':
+        return None
+    
+    client = request.remote_addr or '127.0.0.1'
+    if request.endpoint == 'search_products':
+        allowed, retry_after = search_rate_limiter.consume(client)
+    else:
+        # One window per route and client, like Flask-Limiter's per-endpoint default limits
+        allowed, retry_after = default_rate_limiter.hit(f"{request.endpoint}:{client}")
+    
+    if not allowed:
+        response = jsonify({'error': 'Rate limit exceeded, please slow down'})
+        response.status_code = 429
+        response.headers['Retry-After'] = str(retry_after)
+        return response
+    return None
 
 @app.route('/debug/token')
 def debug_token():
@@ -90,7 +164,6 @@ def debug_token():
         return jsonify({"error": str(e)}), 500
 
 @app.route('/api/search', methods=['POST'])
-@limiter.limit("5 per second")  # Server-side rate limiting
 def search_products():
     """Endpoint for product search with filtering and sorting"""
     try:
@@ -98,21 +171,24 @@ def search_products():
         if not request.is_json:
             return jsonify({'error': 'Content-Type must be application/json'}), 400
             
-        # Validate required parameters
-        if not request.json or 'product_name' not in request.json:
-            return jsonify({'error': 'Missing product_name parameter'}), 400
+        # Decode and type-check the body in one pass
+        try:
+            search = msgspec.json.decode(request.get_data(), type=SearchRequest)
+        except msgspec.ValidationError as e:
+            return jsonify({'error': f'Invalid search parameters: {e}'}), 400
+        except msgspec.DecodeError:
+            return jsonify({'error': 'Request body must be valid JSON'}), 400
             
         # Validate product name length
-        product_name = request.json['product_name'].strip()
+        product_name = search.product_name.strip()
         if not product_name or len(product_name) > 200:
             return jsonify({'error': 'Product name must be between 1 and 200 characters'}), 400
         
-        params = request.json
-        product_name = product_name  # Already validated above
-        condition = params.get('condition', 'all')
-        currency = params.get('currency', 'USD')
-        sort_by = params.get('sort_by', '')
-        page = params.get('page', 1)
+        condition = search.condition
+        currency = search.currency
+        sort_by = search.sort_by
+        page = search.page
+        pages = search.pages
         
         # Validate page number
         try:
@@ -122,21 +198,23 @@ def search_products():
         except (ValueError, TypeError):
             page = 1
         
-        # Validate allowed values
-        allowed_conditions = ['all', 'new', 'used']
-        allowed_currencies = ['USD', 'EUR', 'GBP', 'JPY', 'CAD', 'CNY', 'HKD', 'AUD', 'SGD', 'CHF']
+        # Validate number of pages to fetch ('all' fetches every page up to the cap)
+        if pages == 'all':
+            page = 1
+        else:
+            try:
+                pages = min(max(int(pages), 1), MAX_SEARCH_PAGES)
+            except (ValueError, TypeError):
+                pages = 1
         
-        if condition not in allowed_conditions:
+        # Validate allowed values
+        if condition not in ALLOWED_CONDITIONS:
             return jsonify({'error': 'Invalid condition specified'}), 400
-        if currency not in allowed_currencies:
+        if currency not in ALLOWED_CURRENCIES:
             return jsonify({'error': 'Invalid currency specified'}), 400
         
-        # Fetch eBay listings
-        raw_data = fetch_ebay_listings(
-            product_name=product_name,
-            page_number=page,
-            condition=condition
-        )
+        # Fetch eBay listings (multiple pages are fetched concurrently)
+        raw_data = get_cached_ebay_listings(product_name, page, pages, condition)
         
         # Process data (including currency conversion)
         df = process_ebay_data(raw_data, currency)
@@ -149,18 +227,23 @@ def search_products():
         if sort_by:
             df = sort_dataframe(df, sort_by)
         
-        # Convert to dictionary for JSON response
-        results = df.to_dict(orient='records')
-        
-        # Store search parameters in session for export
-        session['last_search_params'] = params
-        
-        return jsonify({
-            'products': results,
-            'count': len(results),
-            'page': page
+        # Hand the client a signed search id carrying the validated parameters (no session
+        # cookie on every search); this worker also keeps the processed results for export
+        results_key = uuid.uuid4().hex
+        cache.set(f"search_results_{results_key}", df, timeout=SEARCH_RESULTS_CACHE_TIMEOUT)
+        search_id = search_id_serializer.dumps({
+            'key': results_key,
+            'params': {**msgspec.structs.asdict(search), 'product_name': product_name, 'page': page, 'pages': pages}
         })
         
+        # Serialize rows with pandas' C JSON writer instead of building a list of dicts first
+        products_json = df.to_json(orient='records').encode()
+        metadata = orjson.dumps({'count': len(df), 'page': page, 'pages': pages, 'search_id': search_id})
+        return Response(
+            b'{"products":' + products_json + b',' + metadata[1:],
+            mimetype='application/json'
+        )
+        
     except (EbayAuthError, ProcessingError) as e:
         logger.error(f"Processing error: {str(e)}")
         return jsonify({'error': 'Failed to process eBay data'}), 500
@@ -175,29 +258,36 @@ def search_products():
 def export_products():
     """Endpoint for exporting filtered/sorted data"""
     try:
-        # Retrieve last search parameters
-        params = session.get('last_search_params')
-        if not params:
+        # Retrieve the parameters of the search being exported
+        search_id = request.args.get('sid', '')
+        try:
+            search = search_id_serializer.loads(search_id, max_age=SEARCH_ID_MAX_AGE) if search_id else None
+        except BadSignature:
+            search = None
+        if not search:
             return jsonify({'error': 'No search data available for export'}), 400
+        params = search['params']
         
         # Validate export format
         export_format = request.args.get('format', 'csv').lower()
-        if export_format not in ['csv', 'excel', 'json']:
+        if export_format not in ALLOWED_EXPORT_FORMATS:
             return jsonify({'error': 'Invalid export format'}), 400
         
+        # Reuse the processed results of the search while they are cached
+        df = cache.get(f"search_results_{search['key']}")
+        if df is not None:
+            return export_data(df, export_format, filename_prefix="ebay_products")
+        
         # Re-run search to get current data
         product_name = params['product_name']
         condition = params.get('condition', 'all')
         currency = params.get('currency', 'USD')
         sort_by = params.get('sort_by', '')
         page = params.get('page', 1)
+        pages = params.get('pages', 1)
         
-        # Fetch eBay listings
-        raw_data = fetch_ebay_listings(
-            product_name=product_name,
-            page_number=page,
-            condition=condition
-        )
+        # Fetch eBay listings (served from cache when the search just ran)
+        raw_data = get_cached_ebay_listings(product_name, page, pages, condition)
         
         # Process data
         df = process_ebay_data(raw_data, currency)
@@ -1,119 +1,255 @@
 import os
 import base64
+import functools
 import requests
+import orjson
 import threading
+import time
 import logging
 from datetime import datetime, timedelta, timezone
 from exceptions import EbayAuthError
+from http_client import build_session
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
-# Token cache with thread safety
+# Cached token as one immutable (access_token, expires_at, refresh_at) tuple with
+# time.monotonic() deadlines. Readers take the tuple reference without the lock, so they
+# never see a token paired with another token's expiry; writers swap it under token_lock.
+token_state = (None, 0.0, 0.0)
+# Wall-clock expiry of the cached token, preformatted for reporting only
 token_cache = {
-    "access_token": None,
-    "expires_at": datetime.min.replace(tzinfo=timezone.utc)
+    "expires_at_iso": datetime.min.replace(tzinfo=timezone.utc).isoformat()
 }
 token_lock = threading.Lock()
 
-def get_ebay_access_token() -> str:
+# Keep-alive session for the OAuth endpoint so refreshes skip the TCP+TLS handshake
+_SESSION = build_session(pool_connections=1, pool_maxsize=4)
+
+# Renew the token once this fraction of its lifetime has passed
+TOKEN_REFRESH_FRACTION = 0.8
+# Delay before retrying after a failed refresh (background refresher and refresh-ahead)
+TOKEN_REFRESH_RETRY = 30
+refresher_state = {"started": False}
+
+# Single-flight refresh: one thread talks to eBay, concurrent callers wait on refresh_done.
+# After a failure, refresh-ahead is not retried before next_attempt_at (a time.monotonic() reading)
+refresh_state = {"in_flight": False, "error": None, "next_attempt_at": 0.0}
+refresh_done = threading.Event()
+refresh_done.set()
+# How long a caller waits for another thread's refresh before giving up
+TOKEN_REFRESH_WAIT = 20
+
+def get_ebay_access_token(force_refresh=False) -> str:
     """Get eBay OAuth token with enhanced error handling and debugging"""
-    global token_cache, token_lock
+    current_time = time.monotonic()
     
-    current_time = datetime.now(timezone.utc)
+    # Lock-free fast path: a single read of the state tuple is atomic, and the lock
+    # is only needed when the token has to be refreshed
+    access_token, expires_at, refresh_at = token_state
+    if not force_refresh and access_token and current_time < expires_at:
+        # Past the refresh point: renew in the background, keep serving the valid token
+        if current_time >= refresh_at:
+            _start_background_refresh()
+        return access_token
     
-    # Check cache first (with lock to ensure thread safety)
+    # Double-checked locking pattern with proper implementation
     with token_lock:
-        if token_cache["access_token"] and current_time < token_cache["expires_at"]:
-            return token_cache["access_token"]
+        # Check cache again after acquiring lock
+        access_token, expires_at, _ = token_state
+        if not force_refresh and access_token and current_time < expires_at:
+            return access_token
     
-    # Verify configuration from environment variables
-    client_id = os.getenv('EBAY_CLIENT_ID')
-    client_secret = os.getenv('EBAY_CLIENT_SECRET')
-    scope = os.getenv('EBAY_SCOPE', 'https://api.ebay.com/oauth/api_scope')
+    # All concurrent cache misses collapse into a single token request
+    _refresh_token()
+    
+    access_token, expires_at, _ = token_state
+    if access_token and time.monotonic() < expires_at:
+        return access_token
+    raise EbayAuthError(f"eBay token refresh failed: {refresh_state['error'] or 'timed out waiting for refresh'}")
 
-    if not client_id or not client_secret:
-        raise EbayAuthError("Empty credentials detected - check EBAY_CLIENT_ID and EBAY_CLIENT_SECRET environment variables")
+def _refresh_token():
+    """Refresh the token once; if a refresh is already running, wait for it instead"""
+    with token_lock:
+        is_leader = _claim_refresh()
     
-    # Prepare authentication
-    auth_string = f"{client_id}:{client_secret}"
+    if not is_leader:
+        refresh_done.wait(timeout=TOKEN_REFRESH_WAIT)
+        return
+    
+    _run_refresh()
+
+def _claim_refresh():
+    """Mark a refresh as running unless one already is (caller holds token_lock)"""
+    if refresh_state["in_flight"]:
+        return False
+    refresh_state["in_flight"] = True
+    refresh_state["error"] = None
+    refresh_done.clear()
+    return True
+
+def _run_refresh():
+    """Request and store a new token, then wake the waiting callers (refresh already claimed)"""
+    try:
+        # The network call happens outside the lock so token readers never wait on it
+        issued_at = time.monotonic()
+        token_data = _request_token()
+        with token_lock:
+            _store_token(token_data, issued_at)
+            refresh_state["next_attempt_at"] = 0.0
+    except EbayAuthError as e:
+        refresh_state["error"] = str(e)
+        refresh_state["next_attempt_at"] = time.monotonic() + TOKEN_REFRESH_RETRY
+        raise
+    finally:
+        with token_lock:
+            refresh_state["in_flight"] = False
+        refresh_done.set()
+
+def _request_token():
+    """Request a new token from the eBay OAuth endpoint and return the token response"""
+    client_id, client_secret, scope = _load_credentials()
+    
+    # Prepare authentication (encoded once per credential pair)
     try:
-        encoded_auth = base64.b64encode(auth_string.encode()).decode()
+        auth_header = _basic_auth_header(client_id, client_secret)
     except Exception as e:
         raise EbayAuthError(f"Base64 encoding failed: {str(e)}")
 
     # Log authentication attempt (without exposing full credentials)
     logger.info(f"Attempting eBay OAuth with Client ID: {client_id[:5]}...{client_id[-5:]}")
 
-    # Double-checked locking pattern with proper implementation
+    try:
+        response = _SESSION.post(
+            "https://api.ebay.com/identity/v1/oauth2/token",
+            headers={
+                "Content-Type": "application/x-www-form-urlencoded",
+                "Authorization": auth_header
+            },
+            data={
+                "grant_type": "client_credentials",
+                "scope": scope
+            },
+            timeout=15
+        )
+        
+        # Detailed error diagnostics
+        if response.status_code != 200:
+            error_msg = (f"eBay API Error {response.status_code}: {response.text}\n"
+                    f"Request Headers: {dict(response.request.headers)}\n"
+                    f"Request Body: {response.request.body}")
+            logger.error(error_msg)
+            raise EbayAuthError(f"eBay API Error {response.status_code}: {response.text}")
+
+        token_data = orjson.loads(response.content)
+        
+        if not all(k in token_data for k in ("access_token", "expires_in")):
+            raise EbayAuthError("Invalid token response format")
+        try:
+            token_data["expires_in"] = int(token_data["expires_in"])
+        except (TypeError, ValueError):
+            raise EbayAuthError(f"Invalid expires_in in token response: {token_data['expires_in']!r}")
+
+        logger.info(f"Successfully obtained eBay access token, expires in {token_data['expires_in']} seconds")
+        return token_data
+        
+    except EbayAuthError:
+        raise
+    except requests.RequestException as e:
+        logger.error(f"Network error during eBay OAuth: {str(e)}")
+        raise EbayAuthError(f"Network error: {str(e)}")
+    except Exception as e:
+        logger.error(f"Unexpected error during eBay OAuth: {str(e)}")
+        raise EbayAuthError(f"Unexpected error: {str(e)}")
+
+@functools.lru_cache(maxsize=1)
+def _load_credentials():
+    """Resolve the OAuth credentials from the environment once (failures are not cached)"""
+    client_id = os.getenv('EBAY_CLIENT_ID')
+    client_secret = os.getenv('EBAY_CLIENT_SECRET')
+    scope = os.getenv('EBAY_SCOPE', 'https://api.ebay.com/oauth/api_scope')
+
+    if not client_id or not client_secret:
+        raise EbayAuthError("Empty credentials detected - check EBAY_CLIENT_ID and EBAY_CLIENT_SECRET environment variables")
+    return client_id, client_secret, scope
+
+@functools.lru_cache(maxsize=4)
+def _basic_auth_header(client_id: str, client_secret: str) -> str:
+    """Build the OAuth Basic Authorization header; credentials are fixed for the process lifetime"""
+    return "Basic " + base64.b64encode(f"{client_id}:{client_secret}".encode()).decode()
+
+def _store_token(token_data, issued_at):
+    """Update the token cache (caller holds token_lock); issued_at is a time.monotonic() reading"""
+    global token_state
+    
+    expires_in = token_data["expires_in"]  # Validated as an int by _request_token
+    # 2 minute buffer, shrunk for short-lived tokens so a fresh token is never already expired
+    lifetime = max(expires_in - 120, expires_in * TOKEN_REFRESH_FRACTION)
+    # One assignment publishes the token and both deadlines together
+    token_state = (
+        token_data["access_token"],
+        issued_at + lifetime,
+        issued_at + expires_in * TOKEN_REFRESH_FRACTION
+    )
+    token_cache["expires_at_iso"] = (datetime.now(timezone.utc) + timedelta(
+        seconds=issued_at + lifetime - time.monotonic()
+    )).isoformat()
+
+def _start_background_refresh():
+    """Renew the token on a background thread unless a refresh is running or recently failed"""
     with token_lock:
-        # Check cache again after acquiring lock
-        if token_cache["access_token"] and current_time < token_cache["expires_at"]:
-            return token_cache["access_token"]
-            
+        if time.monotonic() < refresh_state["next_attempt_at"] or not _claim_refresh():
+            return
+    threading.Thread(target=_refresh_token_background, name="ebay-token-refresh", daemon=True).start()
+
+def _refresh_token_background():
+    """Background refresh-ahead; failures are logged and retried by a caller after TOKEN_REFRESH_RETRY"""
+    try:
+        _run_refresh()
+    except EbayAuthError as e:
+        logger.error(f"Background token refresh failed: {str(e)}")
+
+def start_token_refresher():
+    """Start a daemon thread that keeps the cached token warm (idempotent)"""
+    with token_lock:
+        if refresher_state["started"]:
+            return
+        refresher_state["started"] = True
+    
+    threading.Thread(target=_refresh_token_loop, name="ebay-token-refresher", daemon=True).start()
+    logger.info("Started background eBay token refresher")
+
+def _refresh_token_loop():
+    """Fetch a token now, then renew it each time it reaches its refresh point"""
+    while True:
         try:
-            response = requests.post(
-                "https://api.ebay.com/identity/v1/oauth2/token",
-                headers={
-                    "Content-Type": "application/x-www-form-urlencoded",
-                    "Authorization": f"Basic {encoded_auth}"
-                },
-                data={
-                    "grant_type": "client_credentials",
-                    "scope": scope
-                },
-                timeout=15
-            )
-            
-            # Detailed error diagnostics
-            if response.status_code != 200:
-                error_msg = (f"eBay API Error {response.status_code}: {response.text}\n"
-                        f"Request Headers: {dict(response.request.headers)}\n"
-                        f"Request Body: {response.request.body}")
-                logger.error(error_msg)
-                raise EbayAuthError(f"eBay API Error {response.status_code}: {response.text}")
-
-            token_data = response.json()
-            
-            if not all(k in token_data for k in ("access_token", "expires_in")):
-                raise EbayAuthError("Invalid token response format")
-
-            # Update cache with buffer
-            token_cache["access_token"] = token_data["access_token"]
-            token_cache["expires_at"] = current_time + timedelta(
-                seconds=int(token_data["expires_in"]) - 120  # 2 minute buffer
-            )
-            
-            logger.info(f"Successfully obtained eBay access token, expires in {token_data['expires_in']} seconds")
-            return token_cache["access_token"]
-            
-        except requests.RequestException as e:
-            logger.error(f"Network error during eBay OAuth: {str(e)}")
-            raise EbayAuthError(f"Network error: {str(e)}")
+            get_ebay_access_token(force_refresh=True)
+            delay = token_state[2] - time.monotonic()
         except Exception as e:
-            logger.error(f"Unexpected error during eBay OAuth: {str(e)}")
-            raise EbayAuthError(f"Unexpected error: {str(e)}")
+            # Never let an unexpected error end the refresher thread for good
+            logger.error(f"Background token refresh failed: {str(e)}")
+            delay = TOKEN_REFRESH_RETRY
+        time.sleep(max(delay, 1))
 
 def clear_token_cache():
     """Clear the token cache (useful for testing or manual refresh)"""
-    global token_cache, token_lock
+    global token_state
     
     with token_lock:
-        token_cache["access_token"] = None
-        token_cache["expires_at"] = datetime.min.replace(tzinfo=timezone.utc)
+        token_state = (None, 0.0, 0.0)
+        refresh_state["next_attempt_at"] = 0.0
+        token_cache["expires_at_iso"] = datetime.min.replace(tzinfo=timezone.utc).isoformat()
+        _load_credentials.cache_clear()
         logger.info("eBay token cache cleared")
 
 def get_token_info():
     """Get information about the current token (for debugging)"""
-    global token_cache, token_lock
+    # Lock-free like the token fast path; the expiry string is formatted when the token is stored
+    access_token, expires_at, _ = token_state
     
-    with token_lock:
-        current_time = datetime.now(timezone.utc)
-        is_valid = token_cache["access_token"] and current_time < token_cache["expires_at"]
-        
-        return {
-            "has_token": bool(token_cache["access_token"]),
-            "is_valid": is_valid,
-            "expires_at": token_cache["expires_at"].isoformat() if token_cache["expires_at"] else None,
-            "current_time": current_time.isoformat()
-        }
\ No newline at end of file
+    return {
+        "has_token": bool(access_token),
+        "is_valid": bool(access_token) and time.monotonic() < expires_at,
+        "expires_at": token_cache["expires_at_iso"],
+        "current_time": datetime.now(timezone.utc).isoformat()
+    }
\ No newline at end of file
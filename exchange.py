@@ -1,11 +1,51 @@
+import time
+import threading
 import requests
+import orjson
 from flask import current_app
 from exceptions import ExchangeRateUnavailableError
+from http_client import build_session
+
+# Keep-alive session for exchangerate-api.com, reused across rate lookups
+_SESSION = build_session(pool_connections=1, pool_maxsize=4)
+
+# Conversion tables per base currency; rates move on the order of hours, not requests
+RATE_CACHE_TTL = 3600
+rate_cache = {}  # base_currency -> (conversion_rates, fetched_at)
+rate_cache_lock = threading.Lock()  # Guards rate_fetch_locks only, never held during a fetch
+rate_fetch_locks = {}  # base_currency -> lock serializing refreshes of that table
 
 def get_exchange_rate(base_currency, target_currency):
     if target_currency == 'USD':
         return 1.0
 
+    rates = _get_conversion_rates(base_currency)
+    try:
+        return rates[target_currency]
+    except KeyError:
+        raise ExchangeRateUnavailableError("Invalid currency code in response")
+
+def _get_conversion_rates(base_currency):
+    """Return the cached conversion table for base_currency, fetching it when stale"""
+    cached = rate_cache.get(base_currency)
+    if cached and time.monotonic() - cached[1] < RATE_CACHE_TTL:
+        return cached[0]
+
+    with rate_cache_lock:
+        fetch_lock = rate_fetch_locks.setdefault(base_currency, threading.Lock())
+
+    # One fetch per base currency; a slow or retried fetch never blocks other currencies
+    with fetch_lock:
+        # Another thread may have refreshed the table while we waited
+        cached = rate_cache.get(base_currency)
+        if cached and time.monotonic() - cached[1] < RATE_CACHE_TTL:
+            return cached[0]
+
+        rates = _fetch_conversion_rates(base_currency)
+        rate_cache[base_currency] = (rates, time.monotonic())
+        return rates
+
+def _fetch_conversion_rates(base_currency):
     api_key = current_app.config.get("EXCHANGE_API_KEY")
     if not api_key:
         raise ValueError("Missing EXCHANGE_API_KEY in Flask config")
@@ -13,19 +53,21 @@ def get_exchange_rate(base_currency, target_currency):
     url = f"https://v6.exchangerate-api.com/v6/{api_key}/latest/{base_currency}"
 
     try:
-        response = requests.get(url, timeout=5)
+        response = _SESSION.get(url, timeout=5)
         response.raise_for_status()
-        data = response.json()
+        data = orjson.loads(response.content)
 
         if data['result'] != 'success':
             error_type = data.get('error-type', 'Unknown error')
             raise ExchangeRateUnavailableError(f"ExchangeRate-API error: {error_type}")
 
-        return data["conversion_rates"][target_currency]
+        return data["conversion_rates"]
 
     except requests.exceptions.Timeout:
         raise ExchangeRateUnavailableError("Exchange rate API timed out")
     except requests.exceptions.RequestException as e:
         raise ExchangeRateUnavailableError(f"Request failed: {e}")
     except KeyError:
-        raise ExchangeRateUnavailableError("Invalid currency code in response")
\ No newline at end of file
+        raise ExchangeRateUnavailableError("Invalid currency code in response")
+    except orjson.JSONDecodeError:
+        raise ExchangeRateUnavailableError("Invalid JSON in exchange rate response")
@@ -1,8 +1,40 @@
+import orjson
 import pandas as pd
-from io import BytesIO, StringIO
+from io import BytesIO
 from flask import Response, send_file
 from datetime import datetime
 
+# Rows serialized per chunk when streaming CSV/JSON exports
+EXPORT_CHUNK_ROWS = 10000
+
+# Seller columns mixing numbers with the "N/A" placeholder; Parquet needs one type per column
+PARQUET_NUMERIC_COLUMNS = ("Seller Rating (%)", "Seller Feedback Count")
+
+def _parquet_frame(df):
+    """Coerce mixed number/placeholder columns to numbers, placeholders become nulls"""
+    coerced = {
+        column: pd.to_numeric(df[column], errors='coerce')
+        for column in PARQUET_NUMERIC_COLUMNS
+        if column in df.columns and not pd.api.types.is_numeric_dtype(df[column])
+    }
+    return df.assign(**coerced) if coerced else df
+
+def _iter_csv(df):
+    """Yield the CSV header, then the rows chunk by chunk"""
+    yield df.iloc[:0].to_csv(index=False)
+    for start in range(0, len(df), EXPORT_CHUNK_ROWS):
+        yield df.iloc[start:start + EXPORT_CHUNK_ROWS].to_csv(index=False, header=False)
+
+def _iter_json(df):
+    """Yield a JSON array of records chunk by chunk"""
+    option = orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY
+    yield b"[\n"
+    for start in range(0, len(df), EXPORT_CHUNK_ROWS):
+        records = df.iloc[start:start + EXPORT_CHUNK_ROWS].to_dict(orient='records')
+        separator = b",\n" if start else b""
+        yield separator + b",\n".join(orjson.dumps(record, option=option) for record in records)
+    yield b"\n]\n"
+
 def export_data(df, export_format, filename_prefix="ebay_products"):
     if not isinstance(df, pd.DataFrame) or df.empty:
         return Response("No data available", status=404)
@@ -11,11 +43,8 @@ def export_data(df, export_format, filename_prefix="ebay_products"):
     filename = f"{filename_prefix}_{timestamp}.{export_format}"
 
     if export_format == 'csv':
-        output = StringIO()
-        df.to_csv(output, index=False)
-        output.seek(0)
         return Response(
-            output,
+            _iter_csv(df),
             mimetype='text/csv',
             headers={"Content-Disposition": f"attachment; filename={filename}"}
         )
@@ -38,10 +67,21 @@ def export_data(df, export_format, filename_prefix="ebay_products"):
             download_name=filename
         )
 
+    elif export_format == 'parquet':
+        # Columnar and compressed: far smaller and faster than xlsx, preferred for analytics tooling
+        output = BytesIO()
+        _parquet_frame(df).to_parquet(output, engine='pyarrow', compression='zstd', index=False)
+        output.seek(0)
+        return send_file(
+            output,
+            mimetype='application/vnd.apache.parquet',
+            as_attachment=True,
+            download_name=filename
+        )
+
     elif export_format == 'json':
-        output = df.to_json(orient='records', indent=2)
         return Response(
-            output,
+            _iter_json(df),
             mimetype='application/json',
             headers={"Content-Disposition": f"attachment; filename={filename}"}
         )
@@ -0,0 +1,51 @@
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Upstream statuses that are worth retrying with backoff
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+# The OAuth client_credentials POST is safe to repeat, so retry it alongside GETs
+RETRY_METHODS = frozenset(["GET", "POST"])
+# Longest Retry-After wait honoured; callers may hold semaphores or locks while retrying
+RETRY_AFTER_MAX = 5
+
+class CappedRetry(Retry):
+    """Retry policy that never sleeps longer than RETRY_AFTER_MAX for a Retry-After header
+
+    urllib3 only gained retry_after_max recently (defaulting to 6 hours), so the cap
+    is applied here to behave the same on every supported version.
+    """
+
+    def get_retry_after(self, response):
+        retry_after = super().get_retry_after(response)
+        if retry_after is None:
+            return None
+        return min(retry_after, RETRY_AFTER_MAX)
+
+def build_session(pool_connections=1, pool_maxsize=20):
+    """Create a requests.Session with keep-alive connection pooling and automatic retries
+
+    Rate-limited (429) and unavailable responses are retried with exponential
+    backoff, honouring the server's Retry-After header (capped) when present.
+
+    pool_connections is the number of distinct hosts to keep pools for and
+    pool_maxsize the number of keep-alive connections kept per host.
+    """
+    retries = CappedRetry(
+        total=5,
+        backoff_factor=0.5,
+        status_forcelist=RETRY_STATUS_CODES,
+        allowed_methods=RETRY_METHODS,
+        respect_retry_after_header=True,  # On 429/503 wait as asked (up to RETRY_AFTER_MAX) instead of hammering
+        raise_on_status=False  # Hand the final response back so callers see the real error
+    )
+    adapter = HTTPAdapter(
+        pool_connections=pool_connections,
+        pool_maxsize=pool_maxsize,
+        max_retries=retries,
+        pool_block=True  # Wait for a pooled keep-alive connection instead of opening a throwaway one
+    )
+    
+    session = requests.Session()
+    session.mount("https://", adapter)
+    return session
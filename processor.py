@@ -1,3 +1,4 @@
+import numpy as np
 import pandas as pd
 import logging
 from exchange import get_exchange_rate
@@ -5,6 +6,9 @@ from exceptions import ProcessingError
 
 logger = logging.getLogger(__name__)
 
+# Shared read-only stand-in for missing nested objects (never mutated)
+_EMPTY = {}
+
 def process_ebay_data(data, target_currency):
     items = data.get('itemSummaries', [])
     if not items:
@@ -17,29 +21,46 @@ def process_ebay_data(data, target_currency):
         logger.error(f"Currency conversion failed: {str(e)}")
         raise ProcessingError("Currency conversion unavailable") from e
 
-    rows = []
-    for item in items:
-        try:
-            price_value = item.get("price", {}).get("value")
-            if price_value is None:
-                logger.warning(f"Missing price for item: {item.get('itemId')}")
-                continue
-                
-            rows.append({
-                "Product Title": item.get("title"),
-                "Price": round(float(price_value) * price_converter, 2),
-                "Currency": target_currency,
-                "Condition": item.get("condition", "Unknown"),
-                "Seller Rating (%)": item.get("seller", {}).get("feedbackPercentage", "N/A"),
-                "Seller Feedback Count": item.get("seller", {}).get("feedbackScore", "N/A"),
-                "Item Country": item.get("itemLocation", {}).get("country", "N/A"),
-                "Product URL": item.get("itemWebUrl")
-            })
-        except (TypeError, ValueError) as e:
-            logger.error(f"Error processing item {item.get('itemId')}: {str(e)}")
-            continue
+    # Single pass over the items into preallocated columns; nested objects are looked up once per item
+    n = len(items)
+    titles, price_values, conditions, ratings = [None] * n, [None] * n, [None] * n, [None] * n
+    feedback_counts, countries, urls = [None] * n, [None] * n, [None] * n
+    for i, item in enumerate(items):
+        price = item.get("price") or _EMPTY
+        seller = item.get("seller") or _EMPTY
+        location = item.get("itemLocation") or _EMPTY
+
+        titles[i] = item.get("title")
+        price_values[i] = price.get("value")
+        conditions[i] = item.get("condition") or "Unknown"  # Also covers explicit nulls
+        ratings[i] = seller.get("feedbackPercentage", "N/A")
+        feedback_counts[i] = seller.get("feedbackScore", "N/A")
+        countries[i] = location.get("country", "N/A")
+        urls[i] = item.get("itemWebUrl")
+
+    # Parse every price in one vectorized pass; missing or malformed values become NaN
+    raw_prices = pd.to_numeric(np.asarray(price_values, dtype=object), errors="coerce").astype(np.float64, copy=False)
+
+    df = pd.DataFrame({
+        "Product Title": titles,
+        "Price": np.round(raw_prices * price_converter, 2),
+        "Currency": target_currency,
+        # Categorical: the few distinct condition strings are stored once and rows hold small int codes
+        "Condition": pd.Categorical(conditions),
+        "Seller Rating (%)": ratings,
+        "Seller Feedback Count": feedback_counts,
+        "Item Country": countries,
+        "Product URL": urls
+    })
 
-    return pd.DataFrame(rows)
+    # Drop items without a usable price with a single boolean mask
+    missing_price = np.isnan(raw_prices)
+    if missing_price.any():
+        skipped = [items[i].get('itemId') for i in np.flatnonzero(missing_price)]
+        logger.warning(f"Skipped {len(skipped)} items with missing or invalid price: {skipped}")
+        df = df[~missing_price].reset_index(drop=True)
+
+    return df
 
 def sort_dataframe(df, sort_by):
     if not isinstance(df, pd.DataFrame) or df.empty:
@@ -49,20 +70,23 @@ def sort_dataframe(df, sort_by):
     try:
         if 'price' in sort_by:
             ascending = 'asc' in sort_by
-            df['Price'] = pd.to_numeric(df['Price'], errors='coerce')
+            df = _ensure_numeric(df, 'Price')
             return df.sort_values(by='Price', ascending=ascending, na_position='last')
         elif 'rating' in sort_by:
             ascending = 'asc' in sort_by
-            df["Seller Rating (%)"] = pd.to_numeric(
-                df["Seller Rating (%)"], 
-                errors="coerce"
-            )
+            df = _ensure_numeric(df, "Seller Rating (%)")
             return df.sort_values(by="Seller Rating (%)", ascending=ascending, na_position='last')
     except KeyError:
         logger.error("Invalid sort column requested")
     
     return df
 
+def _ensure_numeric(df, column):
+    """Coerce column to numbers only when it is not numeric already (no in-place mutation)"""
+    if pd.api.types.is_numeric_dtype(df[column]):
+        return df
+    return df.assign(**{column: pd.to_numeric(df[column], errors='coerce')})
+
 # Comprehensive condition mapping based on eBay API values
 # Updated to include all possible eBay condition values with case-insensitive support
 CONDITION_MAPPING = {
@@ -98,41 +122,41 @@ CONDITION_MAPPING = {
     'all': []  # Special case meaning no filter
 }
 
+# Reverse lookup from upper-cased, stripped condition value to its bucket, built once
+CONDITION_TO_BUCKET = {
+    c.upper().strip(): bucket
+    for bucket, conditions in CONDITION_MAPPING.items()
+    for c in conditions
+}
+
 def filter_data(df, condition):
     """Filter DataFrame by condition with improved case-insensitive matching"""
     if condition == 'all' or df.empty:
         return df
     
     condition = condition.lower()
-    valid_conditions = CONDITION_MAPPING.get(condition, [])
-    if not valid_conditions:
+    if not CONDITION_MAPPING.get(condition):
         logger.warning(f"Invalid condition specified: {condition}")
         return df
     
-    # Create a copy to avoid modifying the original
-    df_filtered = df.copy()
-    
-    # Normalize condition values for comparison (case-insensitive)
-    df_filtered['Condition_Normalized'] = df_filtered['Condition'].str.upper().str.strip()
-    
-    # Create a set of normalized valid conditions for faster lookup
-    valid_conditions_normalized = {c.upper().strip() for c in valid_conditions}
-    
-    # Filter based on normalized conditions
-    mask = df_filtered['Condition_Normalized'].isin(valid_conditions_normalized)
-    filtered_df = df_filtered[mask].drop('Condition_Normalized', axis=1)
+    # Map normalized condition values (case-insensitive) to their bucket without copying the frame
+    conditions = df['Condition']
+    if isinstance(conditions.dtype, pd.CategoricalDtype):
+        # Normalize each distinct value once, then select rows by their integer category codes
+        category_buckets = conditions.cat.categories.str.upper().str.strip().map(CONDITION_TO_BUCKET)
+        mask = conditions.cat.codes.isin(np.flatnonzero(category_buckets == condition))
+    else:
+        mask = conditions.str.upper().str.strip().map(CONDITION_TO_BUCKET).eq(condition)
+    filtered_df = df.loc[mask]
     
     # Log detailed information about the filtering
     original_count = len(df)
     filtered_count = len(filtered_df)
     logger.info(f"Condition filtering: '{condition}' - {original_count} items -> {filtered_count} items")
     
-    # Log unique conditions found in the data for debugging
-    unique_conditions = df['Condition'].unique()
-    logger.info(f"Unique conditions in data: {list(unique_conditions)}")
-    
-    # Log which conditions were matched
-    matched_conditions = filtered_df['Condition'].unique()
-    logger.info(f"Matched conditions: {list(matched_conditions)}")
+    # The per-value breakdown scans the column twice, so only build it when debugging
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Unique conditions in data: %s", list(df['Condition'].unique()))
+        logger.debug("Matched conditions: %s", list(filtered_df['Condition'].unique()))
     
     return filtered_df
\ No newline at end of file
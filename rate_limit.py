@@ -0,0 +1,159 @@
+import math
+import logging
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+# Atomic sliding window log: one sorted set of request timestamps (ms) per route and client.
+# Uses the Redis server clock so every worker agrees on the current time.
+SLIDING_WINDOW_SCRIPT = """
+local now_parts = redis.call('TIME')
+local now = now_parts[1] * 1000 + math.floor(now_parts[2] / 1000)
+local window = tonumber(ARGV[1])
+local limit = tonumber(ARGV[2])
+
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - window)
+if redis.call('ZCARD', KEYS[1]) >= limit then
+    local oldest = redis.call('ZRANGE', KEYS[1], 0, 0, 'WITHSCORES')
+    return {0, tonumber(oldest[2]) + window - now}
+end
+
+redis.call('ZADD', KEYS[1], now, ARGV[3])
+redis.call('PEXPIRE', KEYS[1], window)
+return {1, 0}
+"""
+
+
+class TokenBucket:
+    """In-process token bucket rate limiter keyed by client address"""
+
+    def __init__(self, rate, capacity, max_clients=10000):
+        self.rate = rate                # tokens added per second
+        self.capacity = capacity        # maximum burst size
+        self.max_clients = max_clients  # prune idle clients beyond this many
+        self._buckets = {}              # key -> (tokens, last_refill)
+        self._lock = threading.Lock()
+
+    def consume(self, key):
+        """Take one token for key. Returns (allowed, retry_after_seconds)"""
+        now = time.monotonic()
+
+        with self._lock:
+            tokens, last_refill = self._buckets.get(key, (self.capacity, now))
+            tokens = min(self.capacity, tokens + (now - last_refill) * self.rate)
+
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now)
+                if len(self._buckets) > self.max_clients:
+                    self._prune(now)
+                return True, 0
+
+            self._buckets[key] = (tokens, now)
+            return False, math.ceil((1 - tokens) / self.rate)
+
+    def _prune(self, now):
+        """Drop clients whose bucket has refilled completely (caller holds the lock)"""
+        idle = [
+            key for key, (tokens, last_refill) in self._buckets.items()
+            if tokens + (now - last_refill) * self.rate >= self.capacity
+        ]
+        for key in idle:
+            del self._buckets[key]
+
+
+class SlidingWindowCounter:
+    """In-process weighted sliding window rate limiter keyed by route and client address"""
+
+    def __init__(self, limit, window, max_clients=10000):
+        self.limit = limit              # requests allowed per window
+        self.window = window            # window size in seconds
+        self.max_clients = max_clients  # prune idle clients beyond this many
+        self._windows = {}              # key -> (window_start, prev_count, curr_count)
+        self._lock = threading.Lock()
+
+    def hit(self, key):
+        """Count one request for key. Returns (allowed, retry_after_seconds)"""
+        now = time.monotonic()
+
+        with self._lock:
+            window_start, prev_count, curr_count = self._windows.get(key, (now, 0, 0))
+
+            # Roll the windows lazily; after two idle windows the previous count is stale
+            elapsed = now - window_start
+            if elapsed >= self.window:
+                periods = int(elapsed // self.window)
+                prev_count = curr_count if periods == 1 else 0
+                curr_count = 0
+                window_start += periods * self.window
+                elapsed = now - window_start
+
+            # Weight the previous window by how much of it still overlaps the sliding window
+            weight = 1 - elapsed / self.window
+            effective = curr_count + prev_count * weight
+
+            if effective + 1 > self.limit:
+                self._windows[key] = (window_start, prev_count, curr_count)
+                return False, self._retry_after(elapsed, prev_count, curr_count)
+
+            self._windows[key] = (window_start, prev_count, curr_count + 1)
+            if len(self._windows) > self.max_clients:
+                self._prune(now)
+            return True, 0
+
+    def _retry_after(self, elapsed, prev_count, curr_count):
+        """Seconds until the weighted count leaves room for one more request"""
+        room = self.limit - 1 - curr_count
+        if room >= 0 and prev_count:
+            wait = self.window * (1 - room / prev_count) - elapsed
+        elif room < 0:
+            # The current window is full: wait for it to roll over, then for its
+            # (now previous) count to decay enough under the weighting
+            wait = self.window - elapsed + self.window * (1 - (self.limit - 1) / curr_count)
+        else:
+            wait = self.window - elapsed
+        return max(1, math.ceil(wait))
+
+    def _prune(self, now):
+        """Drop clients idle for two full windows (caller holds the lock)"""
+        idle = [
+            key for key, (window_start, _, _) in self._windows.items()
+            if now - window_start >= 2 * self.window
+        ]
+        for key in idle:
+            del self._windows[key]
+
+
+class RedisSlidingWindow:
+    """Sliding window rate limiter shared by all workers through Redis
+
+    Keys are stored as "<key_prefix>:<key>"; callers pass the same route-scoped
+    key as for SlidingWindowCounter so both backends limit identically.
+    """
+
+    def __init__(self, limit, window, storage_uri, key_prefix='ratelimit'):
+        import redis  # Optional dependency, only needed when shared storage is configured
+
+        self.limit = limit
+        self.window = window
+        self.key_prefix = key_prefix
+        self._redis_error = redis.RedisError
+        self._client = redis.Redis.from_url(storage_uri)
+        self._script = self._client.register_script(SLIDING_WINDOW_SCRIPT)
+
+    def hit(self, key):
+        """Count one request for key. Returns (allowed, retry_after_seconds)"""
+        try:
+            allowed, retry_after_ms = self._script(
+                keys=[f"{self.key_prefix}:{key}"],
+                args=[int(self.window * 1000), self.limit, uuid.uuid4().hex]
+            )
+        except self._redis_error as e:
+            # Fail open: an unavailable limiter store should not take the site down
+            logger.warning(f"Rate limit storage unavailable: {str(e)}")
+            return True, 0
+
+        if allowed:
+            return True, 0
+        return False, max(1, math.ceil(int(retry_after_ms) / 1000))
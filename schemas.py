@@ -0,0 +1,11 @@
+from typing import Any, Optional
+import msgspec
+
+class SearchRequest(msgspec.Struct):
+    """Body of POST /api/search, decoded and type-checked by msgspec"""
+    product_name: str
+    condition: str = 'all'
+    currency: str = 'USD'
+    sort_by: Optional[str] = ''  # null is accepted and means no sorting
+    page: Any = 1   # Coerced leniently by the handler, invalid values fall back to 1
+    pages: Any = 1  # Number of pages, or 'all'
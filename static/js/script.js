@@ -10,6 +10,7 @@ document.addEventListener('DOMContentLoaded', () => {
    
     let currentResults = [];
     let currentSearchParams = {};
+    let currentSearchId = '';
 
     // Form submission handler
     searchForm.addEventListener('submit', async (e) => {
@@ -54,8 +55,9 @@ document.addEventListener('DOMContentLoaded', () => {
                 throw new Error(data.error || 'Failed to fetch products');
             }
            
-            // Save results for export
+            // Save results and search id for export
             currentResults = data.products;
+            currentSearchId = data.search_id;
            
             // Display results
             displayResults(data.products, data.count);
@@ -94,7 +96,7 @@ document.addEventListener('DOMContentLoaded', () => {
     document.querySelectorAll('.export-option').forEach(option => {
         option.addEventListener('click', () => {
             const format = option.dataset.format;
-            window.location.href = `/api/export?format=${format}`;
+            window.location.href = `/api/export?format=${format}&sid=${encodeURIComponent(currentSearchId)}`;
             exportModal.classList.add('hidden');
         });
     });